@@ -1,15 +1,49 @@
 from flask import Flask, request, jsonify, render_template
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import sqlite3
+import bisect
 import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-import uuid
+from email import charset
+import secrets
+import queue
+import threading
+from time import monotonic
+
+class SiteFlask(Flask):
+    """Flask app that lets browsers cache the large profile image for a day."""
+
+    def get_send_file_max_age(self, filename):
+        if filename == 'image_diane.png':
+            return 86400
+        # Everything else (index-main.html) keeps Flask's revalidate default
+        return super().get_send_file_max_age(filename)
+
+# Files in static/ (main page, profile image) are served from the site root
+app = SiteFlask(__name__, template_folder='template', static_folder='static', static_url_path='')
+
+# Use orjson for jsonify/request.json when it is installed and Flask has
+# pluggable JSON providers (2.2+); otherwise keep Flask's default encoder
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    class ORJSONProvider(DefaultJSONProvider):
+        """JSON provider that encodes and decodes with orjson."""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default).decode()
 
-app = Flask(__name__, template_folder='template')
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
 
 # Import configuration
 try:
@@ -18,16 +52,41 @@ except ImportError:
     print("Error: config.py not found. Please copy config.sample.py to config.py and fill in your settings.")
     exit(1)
 
-def get_db_connection():
-    """Get a database connection with row factory for easier data access."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+# Hot-path statements, kept as module constants so every call hands sqlite3
+# the same SQL text and hits its prepared-statement cache
+SQL_SELECT_BY_DATE = 'SELECT time, duration FROM appointments WHERE date = ?'
+SQL_INSERT = (
+    'INSERT INTO appointments (name, email, phone, date, time, duration, lesson_type) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?)'
+)
+
+# One long-lived connection per worker thread, so repeated requests on a
+# thread reuse its page cache and prepared statements
+_tls = threading.local()
+
+def get_db_conn():
+    """Get this thread's database connection, opening it on first use."""
+    conn = getattr(_tls, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(
+            DATABASE_PATH, isolation_level=None,
+            cached_statements=256, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        # WAL lets GET /appointments readers run alongside a booking write;
+        # synchronous is per connection, so it is set on every new one
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _tls.conn = conn
     return conn
 
 def init_db():
     """Initialize the database and create tables if they don't exist."""
-    conn = get_db_connection()
+    # One-off connection for setup; request code uses get_db_conn()
+    conn = sqlite3.connect(DATABASE_PATH)
     try:
+        # WAL is persistent in the database file, so switch it on at startup
+        conn.execute('PRAGMA journal_mode=WAL')
         conn.execute('''
             CREATE TABLE IF NOT EXISTS appointments (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,156 +112,107 @@ def init_db():
 init_db()
 
 def get_appointments_for_date(date):
-    """Get all appointments for a specific date from database."""
-    conn = get_db_connection()
+    """Get (time, duration) rows for all appointments on a date from database."""
+    conn = get_db_conn()
     try:
-        appointments = conn.execute(
-            'SELECT * FROM appointments WHERE date = ?', (date,)
-        ).fetchall()
-        return [dict(row) for row in appointments]
+        return conn.execute(SQL_SELECT_BY_DATE, (date,)).fetchall()
     except Exception as e:
         app.logger.error(f"Error getting appointments for date {date}: {e}")
         return []
-    finally:
-        conn.close()
 
 def save_appointment(appointment_data):
     """Save an appointment to the database with collision checking."""
-    conn = get_db_connection()
+    conn = get_db_conn()
     try:
-        conn.execute('''
-            INSERT INTO appointments (name, email, phone, date, time, duration, lesson_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            appointment_data['name'],
-            appointment_data.get('email', ''),
-            appointment_data.get('phone', ''),
-            appointment_data['date'],
-            appointment_data['time'],
-            appointment_data['duration'],
-            appointment_data['lesson_type']
-        ))
-        conn.commit()
+        # Take the write lock up front rather than upgrading mid-transaction
+        conn.execute('BEGIN IMMEDIATE')
+        with conn:
+            # The UNIQUE constraint only catches exact duplicates; re-check
+            # overlaps under the write lock so a stale slot list (cached in
+            # another worker or in the browser) can never double-book
+            booked_ints = sorted(
+                (time_to_minutes(t), d)
+                for t, d in conn.execute(SQL_SELECT_BY_DATE, (appointment_data['date'],))
+            )
+            start_min = time_to_minutes(appointment_data['time'])
+            if not _filter_slots([start_min], booked_ints, appointment_data['duration'],
+                                 travel_buffer(appointment_data['lesson_type'])):
+                return False, "slot_taken"
+            conn.execute(SQL_INSERT, (
+                appointment_data['name'],
+                appointment_data.get('email', ''),
+                appointment_data.get('phone', ''),
+                appointment_data['date'],
+                appointment_data['time'],
+                appointment_data['duration'],
+                appointment_data['lesson_type']
+            ))
         return True, "Appointment saved successfully"
     except sqlite3.IntegrityError:
-        return False, "This time slot is already booked. Please select a different time."
+        # The UNIQUE(date, time, duration) constraint rejected the insert
+        return False, "slot_taken"
     except Exception as e:
         app.logger.error(f"Error saving appointment: {e}")
         return False, "Failed to save appointment. Please try again."
-    finally:
-        conn.close()
-
-def is_slot_available(date, time, duration):
-    """Check if a specific time slot is available."""
-    conn = get_db_connection()
-    try:
-        existing = conn.execute(
-            'SELECT id FROM appointments WHERE date = ? AND time = ? AND duration = ?',
-            (date, time, duration)
-        ).fetchone()
-        return existing is None
-    except Exception as e:
-        app.logger.error(f"Error checking slot availability: {e}")
-        return False
-    finally:
-        conn.close()
-
-def create_ics_file(appointment_data):
-    """Create a proper .ics calendar invitation file for the appointment."""
-    # Parse the date and time
-    appointment_date = appointment_data['date']  # YYYY-MM-DD format
-    appointment_time = appointment_data['time']  # HH:MM format
-    duration = appointment_data['duration']  # minutes
-
-    # Create datetime objects (assume Vienna timezone - Central European Time)
-    from datetime import datetime, timedelta, timezone
 
-    # Parse as local Vienna time and convert to UTC for .ics file
-    local_datetime = datetime.strptime(f"{appointment_date} {appointment_time}", "%Y-%m-%d %H:%M")
-
-    # Vienna is UTC+1 (CET) or UTC+2 (CEST), for simplicity using UTC+1
-    # In production, you'd want proper timezone handling
-    vienna_offset = timedelta(hours=1)
-    start_utc = local_datetime - vienna_offset
-    end_utc = start_utc + timedelta(minutes=duration)
-
-    # Format for .ics (UTC format with Z suffix)
-    start_str = start_utc.strftime("%Y%m%dT%H%M%SZ")
-    end_str = end_utc.strftime("%Y%m%dT%H%M%SZ")
-    created_str = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-
-    # Generate unique ID
-    event_uid = str(uuid.uuid4()) + "@piano-lessons.com"
-
-    # Format lesson type for display
-    lesson_type_display = appointment_data['lesson_type']
-    if lesson_type_display == 'Student Location':
-        lesson_type_display = 'At Student\'s Location'
-    elif lesson_type_display == 'Teacher Location':
-        lesson_type_display = 'At Teacher\'s Location'
-
-    # Escape special characters in description for .ics format
-    description = f"Piano lesson with {appointment_data['name']}\\n\\nLesson Type: {lesson_type_display}\\nDuration: {duration} minutes\\n\\nStudent Contact:\\nEmail: {appointment_data.get('email', 'Not provided')}\\nPhone: {appointment_data.get('phone', 'Not provided')}"
-
-    # Clean email for attendee (handle missing email)
-    attendee_email = appointment_data.get('email', 'noemail@example.com')
-    attendee_name = appointment_data['name']
-
-    # Create .ics content - simplified for better Outlook compatibility
-    ics_content = f"""BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:-//Piano Lessons//Piano Lesson Booking//EN
-METHOD:PUBLISH
-BEGIN:VEVENT
-UID:{event_uid}
-DTSTART:{start_str}
-DTEND:{end_str}
-DTSTAMP:{created_str}
-SUMMARY:Piano Lesson - {appointment_data['name']}
-DESCRIPTION:{description}
-ORGANIZER:mailto:{EMAIL_USER}
-STATUS:CONFIRMED
-SEQUENCE:0
-BEGIN:VALARM
-TRIGGER:-PT15M
-ACTION:DISPLAY
-DESCRIPTION:Reminder
-END:VALARM
-END:VEVENT
-END:VCALENDAR"""
-
-    return ics_content
-
-def create_booking_email(appointment_data):
-    """Create a professional email template for booking notifications."""
-    subject = f"New Piano Lesson Booking - {appointment_data['name']} - {appointment_data['date']}"
-
-    # Format lesson type for display
-    lesson_type_display = appointment_data['lesson_type']
-    if lesson_type_display == 'Student Location':
-        lesson_type_display = 'At Student\'s Location'
-    elif lesson_type_display == 'Teacher Location':
-        lesson_type_display = 'At Teacher\'s Location'
-
-    # Create HTML email content
-    html_content = f"""
+# Static scaffolding for the booking email and .ics attachment, built once at
+# import; per-booking values are filled in with str.format_map
+# .ics content - simplified for better Outlook compatibility (RFC 5545 CRLF)
+_ICS_TMPL = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Piano Lessons//Piano Lesson Booking//EN",
+    "METHOD:PUBLISH",
+    "BEGIN:VEVENT",
+    "UID:{uid}",
+    "DTSTART:{start}",
+    "DTEND:{end}",
+    "DTSTAMP:{created}",
+    "SUMMARY:Piano Lesson - {name}",
+    "DESCRIPTION:{description}",
+    "ORGANIZER:mailto:{organizer}",
+    "STATUS:CONFIRMED",
+    "SEQUENCE:0",
+    "BEGIN:VALARM",
+    "TRIGGER:-PT15M",
+    "ACTION:DISPLAY",
+    "DESCRIPTION:Reminder",
+    "END:VALARM",
+    "END:VEVENT",
+    "END:VCALENDAR",
+])
+
+VIENNA = ZoneInfo("Europe/Vienna")
+
+_ICS_CHARSET = charset.Charset('utf-8')
+_ICS_CHARSET.body_encoding = charset.QP
+
+# Escape special characters in description for .ics format
+_ICS_DESCRIPTION_TMPL = (
+    "Piano lesson with {name}\\n\\nLesson Type: {lesson_type}\\nDuration: {duration} minutes"
+    "\\n\\nStudent Contact:\\nEmail: {email}\\nPhone: {phone}"
+)
+
+_EMAIL_SUBJECT_TMPL = "New Piano Lesson Booking - {name} - {date}"
+
+_EMAIL_HTML_TMPL = """
     <html>
     <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
         <h2 style="color: #7b3f00;">New Piano Lesson Booking</h2>
 
         <div style="background-color: #f9f9f9; padding: 20px; border-radius: 8px; margin: 20px 0;">
             <h3 style="margin-top: 0; color: #7b3f00;">Student Information</h3>
-            <p><strong>Name:</strong> {appointment_data['name']}</p>
-            <p><strong>Email:</strong> {appointment_data.get('email', 'Not provided')}</p>
-            <p><strong>Phone:</strong> {appointment_data.get('phone', 'Not provided')}</p>
+            <p><strong>Name:</strong> {name}</p>
+            <p><strong>Email:</strong> {email}</p>
+            <p><strong>Phone:</strong> {phone}</p>
         </div>
 
         <div style="background-color: #f0f8ff; padding: 20px; border-radius: 8px; margin: 20px 0;">
             <h3 style="margin-top: 0; color: #7b3f00;">Lesson Details</h3>
-            <p><strong>Date:</strong> {appointment_data['date']}</p>
-            <p><strong>Time:</strong> {appointment_data['time']}</p>
-            <p><strong>Duration:</strong> {appointment_data['duration']} minutes</p>
-            <p><strong>Lesson Type:</strong> {lesson_type_display}</p>
+            <p><strong>Date:</strong> {date}</p>
+            <p><strong>Time:</strong> {time}</p>
+            <p><strong>Duration:</strong> {duration} minutes</p>
+            <p><strong>Lesson Type:</strong> {lesson_type}</p>
         </div>
 
         <p style="margin-top: 30px; font-size: 14px; color: #666;">
@@ -212,28 +222,81 @@ def create_booking_email(appointment_data):
     </html>
     """
 
-    # Create plain text version
-    text_content = f"""
+_EMAIL_TEXT_TMPL = """
 New Piano Lesson Booking
 
 Student Information:
-- Name: {appointment_data['name']}
-- Email: {appointment_data.get('email', 'Not provided')}
-- Phone: {appointment_data.get('phone', 'Not provided')}
+- Name: {name}
+- Email: {email}
+- Phone: {phone}
 
 Lesson Details:
-- Date: {appointment_data['date']}
-- Time: {appointment_data['time']}
-- Duration: {appointment_data['duration']} minutes
-- Lesson Type: {lesson_type_display}
+- Date: {date}
+- Time: {time}
+- Duration: {duration} minutes
+- Lesson Type: {lesson_type}
 
 This booking was submitted through your piano lesson website.
     """
 
+_LESSON_TYPE_DISPLAY = {
+    'Student Location': 'At Student\'s Location',
+    'Teacher Location': 'At Teacher\'s Location',
+}
+
+def _template_context(appointment_data):
+    """Collect the values shared by the email and .ics templates."""
+    lesson_type = appointment_data['lesson_type']
+    return {
+        'name': appointment_data['name'],
+        'email': appointment_data.get('email', 'Not provided'),
+        'phone': appointment_data.get('phone', 'Not provided'),
+        'date': appointment_data['date'],
+        'time': appointment_data['time'],
+        'duration': appointment_data['duration'],
+        # Format lesson type for display
+        'lesson_type': _LESSON_TYPE_DISPLAY.get(lesson_type, lesson_type),
+    }
+
+def create_ics_file(appointment_data):
+    """Create a proper .ics calendar invitation file for the appointment."""
+    # Parse the date and time
+    appointment_date = appointment_data['date']  # YYYY-MM-DD format
+    appointment_time = appointment_data['time']  # HH:MM format
+    duration = appointment_data['duration']  # minutes
+
+    # Lessons are given in Vienna; interpret the slot as local time there
+    # (CET/CEST handled by zoneinfo) and convert to UTC for the .ics file
+    local_datetime = datetime.fromisoformat(f"{appointment_date}T{appointment_time}").replace(tzinfo=VIENNA)
+    start_utc = local_datetime.astimezone(timezone.utc)
+    end_utc = start_utc + timedelta(minutes=duration)
+
+    ctx = _template_context(appointment_data)
+    ctx['description'] = _ICS_DESCRIPTION_TMPL.format_map(ctx)
+    ctx['organizer'] = EMAIL_USER
+    # Format for .ics (UTC format with Z suffix)
+    ctx['start'] = start_utc.strftime("%Y%m%dT%H%M%SZ")
+    ctx['end'] = end_utc.strftime("%Y%m%dT%H%M%SZ")
+    ctx['created'] = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    # Generate unique ID
+    ctx['uid'] = f"{secrets.token_hex(16)}@piano-lessons.com"
+
+    return _ICS_TMPL.format_map(ctx)
+
+def create_booking_email(appointment_data):
+    """Create a professional email template for booking notifications."""
+    ctx = _template_context(appointment_data)
+    subject = _EMAIL_SUBJECT_TMPL.format_map(ctx)
+    html_content = _EMAIL_HTML_TMPL.format_map(ctx)
+    text_content = _EMAIL_TEXT_TMPL.format_map(ctx)
     return subject, html_content, text_content
 
-def send_booking_email(appointment_data):
-    """Send booking notification email with .ics calendar attachment."""
+def send_booking_email(appointment_data, server):
+    """Send booking notification email with .ics calendar attachment.
+
+    `server` is an already logged-in SMTP connection. A dropped connection
+    is re-raised so the caller can reconnect and retry.
+    """
     try:
         # Create email content
         subject, html_content, text_content = create_booking_email(appointment_data)
@@ -263,10 +326,10 @@ def send_booking_email(appointment_data):
         # Create .ics calendar file as simple attachment
         ics_filename = f"piano_lesson_{appointment_data['name'].replace(' ', '_')}_{appointment_data['date']}.ics"
 
-        # Use basic MIMEBase for better compatibility
-        ics_attachment = MIMEBase('application', 'octet-stream')
-        ics_attachment.set_payload(ics_content.encode('utf-8'))
-        encoders.encode_base64(ics_attachment)
+        # Attach as text/calendar; quoted-printable leaves the (mostly ASCII)
+        # payload readable instead of inflating it with base64
+        ics_attachment = MIMEText(ics_content, 'calendar', _ICS_CHARSET)
+        ics_attachment.set_param('method', 'PUBLISH')
         ics_attachment.add_header(
             'Content-Disposition',
             f'attachment; filename="{ics_filename}"'
@@ -276,31 +339,81 @@ def send_booking_email(appointment_data):
         msg.attach(ics_attachment)
 
         # Send email
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.send_message(msg)
+        server.send_message(msg)
 
         app.logger.info(f"Booking notification email with calendar attachment sent for {appointment_data['name']}")
         return True
 
+    except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+        raise
     except Exception as e:
         app.logger.error(f"Failed to send booking email: {e}")
         return False
 
+# Booking emails are sent from a background thread so the SMTP round trips
+# never hold up the HTTP response
+EMAIL_Q = queue.Queue()
+
+# Upper bound (seconds) on any single SMTP operation, so a silently dropped
+# connection cannot stall the email queue
+SMTP_TIMEOUT = 30
+
+def _smtp_connect():
+    """Open and authenticate a new SMTP connection."""
+    server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        server.starttls()
+        server.login(EMAIL_USER, EMAIL_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def _send_with_reconnect(appointment, server):
+    """Send one booking email, reconnecting once if the connection dropped.
+
+    Returns the (possibly new) connection and whether the email was sent.
+    """
+    for attempt in range(2):
+        try:
+            if server is None:
+                server = _smtp_connect()
+            return server, send_booking_email(appointment, server)
+        except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+            if server is not None:
+                server.close()
+                server = None
+            if attempt:
+                app.logger.error(f"Failed to send booking email: {e}")
+        except Exception as e:
+            if server is not None:
+                server.close()
+            app.logger.error(f"Failed to connect to mail server: {e}")
+            return None, False
+    return None, False
+
+def _email_worker():
+    """Send queued booking notification emails over one persistent connection."""
+    server = None
+    while True:
+        appointment = EMAIL_Q.get()
+        try:
+            server, sent = _send_with_reconnect(appointment, server)
+            if sent:
+                app.logger.info(f"Email notification sent for booking: {appointment['name']}")
+            else:
+                app.logger.warning(f"Failed to send email notification for booking: {appointment['name']}")
+        finally:
+            EMAIL_Q.task_done()
+
+threading.Thread(target=_email_worker, name='email-worker', daemon=True).start()
+
 # Database is now used for appointments storage
 
 @app.route('/')
 def index():
     # Serve the main website instead of the booking-only template
-    with open('index-main.html', 'r', encoding='utf-8') as f:
-        return f.read()
-
-@app.route('/image_diane.png')
-def serve_image():
-    # Serve the profile image
-    from flask import send_file
-    return send_file('image_diane.png')
+    return app.send_static_file('index-main.html')
 
 #@app.route('/appointments', methods=['GET'])
 #def get_appointments():
@@ -317,60 +430,158 @@ appointments_sample = [
 ## ----------------------------------------------------------------------
 ## Helpers
 ## ----------------------------------------------------------------------
-def time_to_minutes(t: str) -> int:
+# Every half hour of the day, both ways; booked and offered times are
+# always on this grid, so conversions are a single dict lookup
+_T2M = {f"{h:02d}:{m:02d}": h * 60 + m for h in range(24) for m in (0, 30)}
+_M2T = {v: k for k, v in _T2M.items()}
+#
+def _time_to_minutes(t: str) -> int:
     h, m = map(int, t.split(":"))
     return h * 60 + m
 #
-def minutes_to_time(m: int) -> str:
+def _minutes_to_time(m: int) -> str:
     h, m = divmod(m, 60)
     return f"{h:02d}:{m:02d}"
 #
-def generate_available_slots(date: str, dur: int, session_type: str):
+def time_to_minutes(t: str) -> int:
+    m = _T2M.get(t)
+    return _time_to_minutes(t) if m is None else m
+#
+def minutes_to_time(m: int) -> str:
+    t = _M2T.get(m)
+    return _minutes_to_time(m) if t is None else t
+#
+# Bookable window and the half hour slot starts inside it (08:00 to 19:30)
+DAY_START = 8 * 60
+DAY_END = 20 * 60
+CANDIDATES = range(DAY_START, DAY_END, 30)
+
+# Lesson lengths (minutes) that can be booked
+OFFERED_DURATIONS = (30, 60)
+#
+def _candidates(dur: int) -> range:
+    """Slot starts (minutes) that leave room for a `dur` minute lesson before 20:00."""
+    return CANDIDATES[:max(0, (DAY_END - dur - DAY_START) // 30 + 1)]
+#
+def _all_slots(dur: int) -> list:
+    """Every candidate start time for `dur`, formatted as HH:MM."""
+    return [minutes_to_time(m) for m in _candidates(dur)]
+#
+# Answer for a day without bookings, per offered duration (do not mutate)
+_ALL_SLOTS = {d: _all_slots(d) for d in OFFERED_DURATIONS}
+#
+def travel_buffer(session_type: str) -> int:
+    """Buffer in minutes before and after a lesson – only for Student Location."""
+    return 30 if session_type == "Student Location" else 0
+#
+def _filter_slots(cands, booked_ints, dur: int, buffer: int) -> list:
     """
-    Return half‑hour start times that do **not** overlap any booked slot.
-    If `session_type` == "Student Location" we reserve an extra 30 min
-    before **and** after the requested slot (travel/buffer).
+    Return the candidate start minutes in `cands` that do not overlap any
+    (start_min, duration) pair in `booked_ints` (sorted by start).
+    Works purely on ints so it can be reused for bulk availability queries.
     """
-    # All possible half hour slots from 08:00 to 19:30
-    possible = [minutes_to_time(m) for m in range(8 * 60, 20 * 60, 30)]
-
-    # Booked slots for the requested day from database
-    booked = get_appointments_for_date(date)
-
-    # Buffer in minutes – only for Student Location
-    buffer = 30 if session_type == "Student Location" else 0
-
-    available = []
-    for start in possible:
-        start_min = time_to_minutes(start)
-        end_min   = start_min + dur
-
-        # Slot must stay inside the 08:00‑20:00 window
-        if end_min > 20 * 60:
-            continue
-
+    # Sorted start times plus the running maximum of end times: the bookings
+    # starting before a slot ends are a prefix of `starts`, and the slot
+    # overlaps one of them iff the latest end within that prefix is after
+    # the slot starts (also correct if bookings themselves overlap)
+    starts = [b_start for b_start, _ in booked_ints]
+    max_ends = []
+    latest_end = 0
+    for b_start, b_dur in booked_ints:
+        latest_end = max(latest_end, b_start + b_dur)
+        max_ends.append(latest_end)
+
+    free = []
+    for start_min in cands:
         # Apply travel buffer: the *effective* occupied interval becomes
         # [start‑buffer , end+buffer)
         eff_start = start_min - buffer
-        eff_end   = end_min + buffer
+        eff_end   = start_min + dur + buffer
 
         # Do not allow negative minutes – treat as 0
         if eff_start < 0:
             eff_start = 0
 
-        # Check overlap with every booked appointment
-        overlap = False
-        for b in booked:
-            b_start = time_to_minutes(b["time"])
-            b_end   = b_start + b["duration"]
-            if eff_start < b_end and eff_end > b_start:
-                overlap = True
-                break
+        # Last booking starting before eff_end decides the overlap
+        i = bisect.bisect_left(starts, eff_end) - 1
+        if i < 0 or max_ends[i] <= eff_start:
+            free.append(start_min)
+
+    return free
+#
+def generate_available_slots(date: str, dur: int, session_type: str):
+    """
+    Return half‑hour start times that do **not** overlap any booked slot.
+    If `session_type` == "Student Location" we reserve an extra 30 min
+    before **and** after the requested slot (travel/buffer).
+    """
+    # Slot must stay inside the 08:00‑20:00 window, so only starts that
+    # leave room for the full lesson are candidates
+    possible_min = _candidates(dur)
+
+    # Booked slots for the requested day from database, converted to
+    # (start_min, duration) once instead of for every candidate slot
+    booked = get_appointments_for_date(date)
+    if not booked:
+        # Nothing booked: every slot in the window is free
+        return _ALL_SLOTS[dur] if dur in _ALL_SLOTS else _all_slots(dur)
+
+    booked_ints = sorted((time_to_minutes(t), d) for t, d in booked)
 
-        if not overlap:
-            available.append(start)
+    buffer = travel_buffer(session_type)
 
-    return available
+    free = _filter_slots(possible_min, booked_ints, dur, buffer)
+    return [minutes_to_time(m) for m in free]
+
+# ----------------------------------------------------------------------
+# Availability cache
+# ----------------------------------------------------------------------
+# (date, duration, type) -> (expires_at, response dict). Entries for a day
+# are dropped as soon as a booking for that day succeeds, so the TTL only
+# bounds staleness from writes made outside this process. A stale list can
+# at worst offer a taken slot: save_appointment re-checks overlaps.
+# Each day also has a version, bumped on invalidation, so a result computed
+# before a booking committed is not stored after the invalidation ran.
+AVAIL_CACHE_TTL = 30
+AVAIL_CACHE_MAXSIZE = 1024
+AVAIL_CACHE = {}
+_avail_versions = {}
+_avail_cache_lock = threading.Lock()
+
+def availability_version(day):
+    """Return the current cache version for `day`."""
+    with _avail_cache_lock:
+        return _avail_versions.get(day, 0)
+
+def get_cached_availability(key):
+    """Return the cached availability response for `key`, or None."""
+    with _avail_cache_lock:
+        entry = AVAIL_CACHE.get(key)
+        if entry is None:
+            return None
+        if entry[0] < monotonic():
+            del AVAIL_CACHE[key]
+            return None
+        return entry[1]
+
+def set_cached_availability(key, payload, version):
+    """Store an availability response, evicting the oldest entry when full.
+
+    Nothing is stored if the day was invalidated since `version` was read.
+    """
+    with _avail_cache_lock:
+        if _avail_versions.get(key[0], 0) != version:
+            return
+        if key not in AVAIL_CACHE and len(AVAIL_CACHE) >= AVAIL_CACHE_MAXSIZE:
+            del AVAIL_CACHE[next(iter(AVAIL_CACHE))]
+        AVAIL_CACHE[key] = (monotonic() + AVAIL_CACHE_TTL, payload)
+
+def invalidate_availability(day):
+    """Drop every cached availability response for `day`."""
+    with _avail_cache_lock:
+        _avail_versions[day] = _avail_versions.get(day, 0) + 1
+        for key in [k for k in AVAIL_CACHE if k[0] == day]:
+            del AVAIL_CACHE[key]
 
 # ----------------------------------------------------------------------
 # Route
@@ -387,15 +598,24 @@ def get_appointments():
         app.logger.error("Missing required parameters")
         return jsonify({"error": "date and d (duration) are required"}), 400
 
-    slots = generate_available_slots(date, dur, typ)
-    app.logger.info(f"Generated {len(slots)} slots: {slots}")
-
-    return jsonify({
-        "date": date,
-        "duration": dur,
-        "type": typ,
-        "available": slots
-    })
+    key = (date, dur, typ)
+    payload = get_cached_availability(key)
+    if payload is None:
+        version = availability_version(date)
+        slots = generate_available_slots(date, dur, typ)
+        app.logger.info(f"Generated {len(slots)} slots: {slots}")
+        payload = {
+            "date": date,
+            "duration": dur,
+            "type": typ,
+            "available": slots
+        }
+        set_cached_availability(key, payload, version)
+
+    # Browsers must revalidate: a booking cannot invalidate their copy
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 ##@app.route('/appointments', methods=['GET'])
@@ -422,7 +642,7 @@ def submit_appointment():
     name        = data.get('name', '').strip()
     
     errors = {}
-    if duration not in [30, 60]:
+    if duration not in OFFERED_DURATIONS:
         errors['duration'] = 'Invalid duration'
     if not day or not time:
         errors['datetime'] = 'Select a day and time'
@@ -434,13 +654,6 @@ def submit_appointment():
     if errors:
         return jsonify({'success': False, 'errors': errors}), 400
 
-    # Check if slot is available before saving
-    if not is_slot_available(day, time, duration):
-        return jsonify({
-            'success': False,
-            'errors': {'slot': 'This time slot is already booked. Please select a different time.'}
-        }), 400
-
     appointment = {
         'name': name,
         'date': day,  # Changed from 'day' to 'date' to match database schema
@@ -451,20 +664,22 @@ def submit_appointment():
         'phone': phone
     }
 
-    # Save to database
+    # Save to database; the UNIQUE constraint doubles as the availability check
     success, message = save_appointment(appointment)
 
     if success:
         app.logger.info(f"Appointment saved: {appointment}")
+        invalidate_availability(day)
 
-        # Send email notification
-        email_sent = send_booking_email(appointment)
-        if email_sent:
-            app.logger.info(f"Email notification sent for booking: {appointment['name']}")
-        else:
-            app.logger.warning(f"Failed to send email notification for booking: {appointment['name']}")
+        # Queue email notification; it is sent by the background worker
+        EMAIL_Q.put(dict(appointment))
 
         return jsonify({'success': True, 'appointment': appointment, 'message': message})
+    elif message == "slot_taken":
+        return jsonify({
+            'success': False,
+            'errors': {'slot': 'This time slot is already booked. Please select a different time.'}
+        }), 400
     else:
         app.logger.error(f"Failed to save appointment: {message}")
         return jsonify({
@@ -472,5 +687,10 @@ def submit_appointment():
             'errors': {'database': message}
         }), 400
     
+# Production: serve with gunicorn (settings in gunicorn.conf.py), e.g.
+#     gunicorn bb:app
+# bb.py only uses the stdlib besides Flask, so it runs unchanged under PyPy:
+#     pypy3 -m gunicorn bb:app
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Local development only
+    app.run()
@@ -0,0 +1,22 @@
+# Gunicorn configuration for the booking site
+# Usage: gunicorn bb:app   (picks up this file from the working directory)
+
+import multiprocessing
+
+bind = '127.0.0.1:8000'
+
+# One process per CPU, each with a few threads; requests mostly wait on
+# SQLite, so threads are enough to overlap them
+workers = multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = 4
+
+# bb.py starts its email worker thread at import time, and threads do not
+# survive fork(), so the app must be loaded in each worker, not preloaded
+preload_app = False
+
+# Behind nginx, let it serve static/ directly and only proxy the rest:
+#     root /path/to/site/static;
+#     location = / { try_files /index-main.html @app; }
+#     location / { try_files $uri @app; }
+#     location @app { proxy_pass http://127.0.0.1:8000; }